@@ -1,3 +1,5 @@
+from typing import Optional
+
 from avstack_bridge import Bridge
 from avtrust.distributions import TrustArray, TrustBetaDistribution
 from avtrust.measurement import Psm, PsmArray
@@ -17,6 +19,7 @@ from avtrust_msgs.msg import TrackTrustMetric as TrackTrustMetricRos
 from avtrust_msgs.msg import TrackTrustMetricArray as TrackTrustMetricArrayRos
 from avtrust_msgs.msg import Trust as TrustRos
 from avtrust_msgs.msg import TrustArray as TrustArrayRos
+from avtrust_msgs.msg import TrustFrame as TrustFrameRos
 
 
 def get_global_header(timestamp: float):
@@ -26,28 +29,73 @@ def get_global_header(timestamp: float):
     )
 
 
+def rostime_to_time(stamp) -> float:
+    return stamp.sec + stamp.nanosec * 1e-9
+
+
+def refill_sequence(
+    msgs_ros: list,
+    items,
+    converter,
+    header: Header,
+    timestamp: float,
+    pool: Optional[list] = None,
+) -> None:
+    """Overwrite a sequence of ROS messages in place
+
+    Messages are converted into a pool that only grows, sized to the
+    most items seen, and the sequence is filled from the front of it so
+    surplus messages survive a shrink. Without a pool the current
+    entries of the sequence are reused. Items stamped at the same time
+    as the array share its header rather than converting their own.
+    """
+    if pool is None:
+        pool = list(msgs_ros)
+    n_items = 0
+    for i, item in enumerate(items):
+        item_header = header if item.timestamp == timestamp else None
+        if i < len(pool):
+            converter(item, out=pool[i], header=item_header)
+        else:
+            pool.append(converter(item, header=item_header))
+        n_items += 1
+    msgs_ros[:] = pool[:n_items]
+
+
 class TrustBridge:
     # ----------------------------------
     # singleton methods for trust
     # ----------------------------------
     @staticmethod
-    def psm_avstack_to_ros(psm: Psm) -> PsmRos:
-        return PsmRos(
-            header=get_global_header(psm.timestamp),
-            target=psm.target,
-            value=psm.value,
-            confidence=psm.confidence,
-            source=psm.source,
-        )
+    def psm_avstack_to_ros(
+        psm: Psm, out: Optional[PsmRos] = None, header: Optional[Header] = None
+    ) -> PsmRos:
+        if out is None:
+            out = PsmRos()
+        if header is None:
+            header = get_global_header(psm.timestamp)
+        out.header = header
+        out.target = psm.target
+        out.value = psm.value
+        out.confidence = psm.confidence
+        out.source = psm.source
+        return out
 
     @staticmethod
-    def trust_avstack_to_ros(trust: TrustBetaDistribution) -> TrustRos:
-        return TrustRos(
-            header=get_global_header(trust.timestamp),
-            identifier=trust.identifier,
-            alpha=trust.alpha,
-            beta=trust.beta,
-        )
+    def trust_avstack_to_ros(
+        trust: TrustBetaDistribution,
+        out: Optional[TrustRos] = None,
+        header: Optional[Header] = None,
+    ) -> TrustRos:
+        if out is None:
+            out = TrustRos()
+        if header is None:
+            header = get_global_header(trust.timestamp)
+        out.header = header
+        out.identifier = trust.identifier
+        out.alpha = trust.alpha
+        out.beta = trust.beta
+        return out
 
     @staticmethod
     def psm_ros_to_avstack(msg: PsmRos) -> Psm:
@@ -119,18 +167,44 @@ class TrustBridge:
     # array methods for trust
     # ----------------------------------
     @staticmethod
-    def psm_array_avstack_to_ros(psms: PsmArray) -> PsmArrayRos:
-        psms_ros = [TrustBridge.psm_avstack_to_ros(psm) for psm in psms]
-        header = get_global_header(psms.timestamp)
-        return PsmArrayRos(header=header, psms=psms_ros)
+    def psm_array_avstack_to_ros(
+        psms: PsmArray,
+        out: Optional[PsmArrayRos] = None,
+        pool: Optional[list] = None,
+    ) -> PsmArrayRos:
+        """Convert psms to ROS, optionally overwriting a reused message"""
+        if out is None:
+            out = PsmArrayRos()
+        out.header = get_global_header(psms.timestamp)
+        refill_sequence(
+            out.psms,
+            psms,
+            TrustBridge.psm_avstack_to_ros,
+            header=out.header,
+            timestamp=psms.timestamp,
+            pool=pool,
+        )
+        return out
 
     @staticmethod
-    def trust_array_avstack_to_ros(trusts: TrustArray) -> TrustArrayRos:
-        trusts_ros = [
-            TrustBridge.trust_avstack_to_ros(trust) for trust in trusts.trusts.values()
-        ]
-        header = get_global_header(trusts.timestamp)
-        return TrustArrayRos(header=header, trusts=trusts_ros)
+    def trust_array_avstack_to_ros(
+        trusts: TrustArray,
+        out: Optional[TrustArrayRos] = None,
+        pool: Optional[list] = None,
+    ) -> TrustArrayRos:
+        """Convert trusts to ROS, optionally overwriting a reused message"""
+        if out is None:
+            out = TrustArrayRos()
+        out.header = get_global_header(trusts.timestamp)
+        refill_sequence(
+            out.trusts,
+            trusts.trusts.values(),
+            TrustBridge.trust_avstack_to_ros,
+            header=out.header,
+            timestamp=trusts.timestamp,
+            pool=pool,
+        )
+        return out
 
     @staticmethod
     def psm_array_ros_to_avstack(msg: PsmArrayRos) -> PsmArray:
@@ -144,6 +218,50 @@ class TrustBridge:
         timestamp = Bridge.rostime_to_time(msg.header.stamp)
         return TrustArray(timestamp=timestamp, trusts=trusts)
 
+    # ----------------------------------
+    # composite methods for trust
+    # ----------------------------------
+    @staticmethod
+    def trust_frame_avstack_to_ros(
+        psms_agents: PsmArray,
+        psms_tracks: PsmArray,
+        trust_agents: TrustArray,
+        trust_tracks: TrustArray,
+        out: Optional[TrustFrameRos] = None,
+        pools: Optional[dict] = None,
+    ) -> TrustFrameRos:
+        """Convert all outputs of an estimator step into one message
+
+        Pass the same pools dict with the same out message on every call
+        to keep one pool of sub-messages per sequence of the frame.
+        """
+        if out is None:
+            out = TrustFrameRos()
+        if pools is None:
+            pools = {}
+        out.header = get_global_header(trust_agents.timestamp)
+        TrustBridge.psm_array_avstack_to_ros(
+            psms_agents,
+            out=out.psms_agents,
+            pool=pools.setdefault("psms_agents", list(out.psms_agents.psms)),
+        )
+        TrustBridge.psm_array_avstack_to_ros(
+            psms_tracks,
+            out=out.psms_tracks,
+            pool=pools.setdefault("psms_tracks", list(out.psms_tracks.psms)),
+        )
+        TrustBridge.trust_array_avstack_to_ros(
+            trust_agents,
+            out=out.trust_agents,
+            pool=pools.setdefault("trust_agents", list(out.trust_agents.trusts)),
+        )
+        TrustBridge.trust_array_avstack_to_ros(
+            trust_tracks,
+            out=out.trust_tracks,
+            pool=pools.setdefault("trust_tracks", list(out.trust_tracks.trusts)),
+        )
+        return out
+
     # ----------------------------------
     # array methods for metrics
     # ----------------------------------
@@ -1,30 +1,64 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
 import rclpy
-from avstack_bridge import Bridge
 from avstack_bridge.geometry import GeometryBridge
 from avstack_bridge.tracks import TrackBridge
 from avstack_msgs.msg import BoxTrackArray
 from avtrust.estimator import TrustEstimator
 from avtrust.measurement import ViewBasedPsm
 from avtrust.updater import TrustUpdater
-from geometry_msgs.msg import PolygonStamped
-from message_filters import ApproximateTimeSynchronizer, Subscriber
+from geometry_msgs.msg import PolygonStamped, TransformStamped
+from message_filters import Subscriber
+from rclpy.duration import Duration
 from rclpy.node import Node
 from rclpy.time import Time
+from tf2_msgs.msg import TFMessage
 from tf2_ros.buffer import Buffer
-from tf2_ros.transform_listener import TransformListener
 
 from avtrust_msgs.msg import PsmArray as PsmArrayRos
 from avtrust_msgs.msg import TrustArray as TrustArrayRos
+from avtrust_msgs.msg import TrustFrame as TrustFrameRos
 
-from .bridge import TrustBridge
+from .bridge import TrustBridge, rostime_to_time
+from .profiling import StageContext, StageTimer, null_stage
+from .synchronizer import ApproximateEpsilonTimeSynchronizer
 
 
 class TrustEstimatorNode(Node):
     def __init__(self, verbose: bool = False):
         super().__init__("trust_psm")
         self.verbose = verbose
+        rmw = rclpy.get_rmw_implementation_identifier()
+        if rmw != "rmw_cyclonedds_cpp":
+            self.get_logger().warning(
+                f"Running on {rmw}; rmw_cyclonedds_cpp is recommended for latency"
+            )
         self.declare_parameter("n_agents", 4)
         self.n_agents = self.get_parameter("n_agents").value
+        self.declare_parameter("sync_epsilon", 0.01)
+        self.sync_epsilon = self.get_parameter("sync_epsilon").value
+        self.declare_parameter("max_rejected_rate", 10.0)
+        self.max_rejected_rate = self.get_parameter("max_rejected_rate").value
+        self.declare_parameter("rt_priority", 20)
+        self.rt_priority = self.get_parameter("rt_priority").value
+        self.declare_parameter("cpu_affinity", -1)
+        self.cpu_affinity = self.get_parameter("cpu_affinity").value
+        self.declare_parameter("legacy_split_topics", True)
+        self.legacy_split_topics = self.get_parameter("legacy_split_topics").value
+        self.declare_parameter("publish_on_change", False)
+        self.publish_on_change = self.get_parameter("publish_on_change").value
+        self.declare_parameter("profile", False)
+        self.profile = self.get_parameter("profile").value
+
+        # frame names are fixed for the life of the node
+        self._world_frame = "world"
+        self._agent_frames = [f"agent{i}" for i in range(self.n_agents)]
+
+        # agent poses are reused until their transform changes
+        self._last_tf_stamp: dict = {}
+        self._last_position: dict = {}
 
         # initialize model
         self.model = TrustEstimator(
@@ -32,7 +66,7 @@ class TrustEstimatorNode(Node):
             updater=TrustUpdater(),
         )
 
-        # qos for topics
+        # qos for output topics
         qos = rclpy.qos.QoSProfile(
             history=rclpy.qos.QoSHistoryPolicy.KEEP_LAST,
             depth=5,
@@ -40,9 +74,41 @@ class TrustEstimatorNode(Node):
             durability=rclpy.qos.QoSDurabilityPolicy.VOLATILE,
         )
 
-        # listen to transform information
+        # qos for the high-rate track/fov inputs -- only the latest matters
+        qos_sensor = rclpy.qos.QoSProfile(
+            history=rclpy.qos.QoSHistoryPolicy.KEEP_LAST,
+            depth=1,
+            reliability=rclpy.qos.QoSReliabilityPolicy.BEST_EFFORT,
+            durability=rclpy.qos.QoSDurabilityPolicy.VOLATILE,
+        )
+
+        # listen to transform information -- we manage the buffer ourselves
+        # so the latest world->agent transforms can be served from a cache
+        # instead of traversing the tf tree for every agent on every tick
+        qos_tf = rclpy.qos.QoSProfile(
+            history=rclpy.qos.QoSHistoryPolicy.KEEP_LAST,
+            depth=100,
+            durability=rclpy.qos.QoSDurabilityPolicy.VOLATILE,
+        )
+        qos_tf_static = rclpy.qos.QoSProfile(
+            history=rclpy.qos.QoSHistoryPolicy.KEEP_LAST,
+            depth=100,
+            durability=rclpy.qos.QoSDurabilityPolicy.TRANSIENT_LOCAL,
+        )
         self.tf_buffer = Buffer()
-        self.tf_listener = TransformListener(self.tf_buffer, self)
+        self._tf_cache: Dict[str, TransformStamped] = {}
+        self.subscriber_tf = self.create_subscription(
+            TFMessage,
+            "/tf",
+            self.tf_receive,
+            qos_profile=qos_tf,
+        )
+        self.subscriber_tf_static = self.create_subscription(
+            TFMessage,
+            "/tf_static",
+            self.tf_static_receive,
+            qos_profile=qos_tf_static,
+        )
 
         # listen to tracks from agents and cc
         self.subscriber_trks = {
@@ -50,7 +116,7 @@ class TrustEstimatorNode(Node):
                 self,
                 BoxTrackArray,
                 f"/agent{agent_ID}/tracks_3d",
-                qos_profile=qos,
+                qos_profile=qos_sensor,
             )
             for agent_ID in range(self.n_agents)
         }
@@ -58,7 +124,7 @@ class TrustEstimatorNode(Node):
             self,
             BoxTrackArray,
             "/command_center/tracks_3d",
-            qos_profile=qos,
+            qos_profile=qos_sensor,
         )
 
         # listen to fov from agents
@@ -67,48 +133,181 @@ class TrustEstimatorNode(Node):
                 self,
                 PolygonStamped,
                 f"/agent{agent_ID}/fov",
-                qos_profile=qos,
+                qos_profile=qos_sensor,
             )
             for agent_ID in range(self.n_agents)
         }
 
         # synchronize track messages
-        self.synchronizer_trks = ApproximateTimeSynchronizer(
+        self.synchronizer_trks = ApproximateEpsilonTimeSynchronizer(
             tuple(self.subscriber_trks.values()) + tuple(self.subscriber_fovs.values()),
-            queue_size=10,
-            slop=0.05,
+            queue_size=2,
+            epsilon=Duration(seconds=self.sync_epsilon),
         )
         self.synchronizer_trks.registerCallback(self.trks_fov_receive)
-
-        # publish PSM messages
-        self.publisher_agent_psms = self.create_publisher(
-            PsmArrayRos,
-            "psms_agents",
-            qos_profile=qos,
-        )
-        self.publisher_track_psms = self.create_publisher(
-            PsmArrayRos,
-            "psms_tracks",
+        self.n_busy_dropped = 0
+        self._n_rejected_last = 0
+        self._n_busy_dropped_last = 0
+        self.timer_rejected = self.create_timer(1.0, self.check_rejected)
+
+        # publish all outputs together
+        self.publisher_trust_frame = self.create_publisher(
+            TrustFrameRos,
+            "trust_frame",
             qos_profile=qos,
         )
 
-        # publish trusts
-        self.publisher_agent_trust = self.create_publisher(
-            TrustArrayRos,
-            "trust_agents",
-            qos_profile=qos,
-        )
-        self.publisher_track_trust = self.create_publisher(
-            TrustArrayRos,
-            "trust_tracks",
-            qos_profile=qos,
-        )
+        # publish outputs on separate topics for existing consumers
+        if self.legacy_split_topics:
+            self.publisher_agent_psms = self.create_publisher(
+                PsmArrayRos,
+                "psms_agents",
+                qos_profile=qos,
+            )
+            self.publisher_track_psms = self.create_publisher(
+                PsmArrayRos,
+                "psms_tracks",
+                qos_profile=qos,
+            )
+            self.publisher_agent_trust = self.create_publisher(
+                TrustArrayRos,
+                "trust_agents",
+                qos_profile=qos,
+            )
+            self.publisher_track_trust = self.create_publisher(
+                TrustArrayRos,
+                "trust_tracks",
+                qos_profile=qos,
+            )
+
+        # output message is overwritten in place each tick from pools of
+        # sub-messages that keep their surplus when a sequence shrinks
+        self._trust_frame_msg = TrustFrameRos()
+        self._trust_frame_pools: Dict[str, list] = {}
+
+        # trust computation runs off the executor thread; at most one step
+        # is in flight and new data is dropped while it is busy
+        self._executor_pool = ThreadPoolExecutor(max_workers=1)
+        self._future = None
+
+        # time each stage of the callback -- stages are prefixed by where
+        # the time goes: "user" is node code, "ros" is rclpy/rmw/DDS
+        self.stage_timer: Optional[StageTimer]
+        self.stage: StageContext
+        if self.profile:
+            self.stage_timer = StageTimer()
+            self.stage = self.stage_timer.stage
+            self.timer_profile = self.create_timer(1.0, self.log_profile)
+        else:
+            self.stage_timer = None
+            self.stage = null_stage
 
         # call reset
         self.reset()
 
     def reset(self):
         self.model.reset()
+        self._tf_cache.clear()
+        self._last_tf_stamp.clear()
+        self._last_position.clear()
+        self._last_content = None
+
+    def configure_scheduling(self):
+        """Run the calling thread under SCHED_FIFO, optionally pinned to a core
+
+        Linux applies scheduling policy and affinity per thread and new
+        threads inherit them from their creating thread. Call this from the
+        thread that will spin the executor, after the node is created and
+        before the executor is: the executor threads and the trust model
+        worker (started lazily on the first step) then inherit the settings,
+        while the DDS and rmw threads already running keep the default
+        policy and all cores so they are never starved by the trust model.
+        For the best latency, isolate the core from the kernel scheduler by
+        adding isolcpus=<cpu_affinity> to the kernel command line. A
+        non-positive rt_priority or negative cpu_affinity leaves that
+        setting alone.
+        """
+        if self.rt_priority > 0:
+            try:
+                os.sched_setscheduler(
+                    0, os.SCHED_FIFO, os.sched_param(self.rt_priority)
+                )
+            except OSError as err:
+                self.get_logger().warning(
+                    f"Cannot set SCHED_FIFO scheduling (needs CAP_SYS_NICE): {err}"
+                )
+        if self.cpu_affinity >= 0:
+            try:
+                os.sched_setaffinity(0, {self.cpu_affinity})
+            except OSError as err:
+                self.get_logger().warning(
+                    f"Cannot pin to CPU {self.cpu_affinity}: {err}"
+                )
+
+    def check_rejected(self):
+        """Warn when messages are dropped faster than expected
+
+        Counts both messages rejected by the synchronizer and synchronized
+        sets dropped because the trust model was still busy.
+        """
+        n_rejected = self.synchronizer_trks.n_rejected
+        n_busy_dropped = self.n_busy_dropped
+        # timer runs at 1 Hz
+        rate_rejected = n_rejected - self._n_rejected_last
+        rate_busy = n_busy_dropped - self._n_busy_dropped_last
+        self._n_rejected_last = n_rejected
+        self._n_busy_dropped_last = n_busy_dropped
+        rate = rate_rejected + rate_busy
+        if rate > self.max_rejected_rate:
+            self.get_logger().warning(
+                f"Dropping {rate:.1f} msgs/sec "
+                f"({rate_rejected:.1f} rejected by synchronizer, "
+                f"{rate_busy:.1f} while trust model busy; "
+                f"threshold {self.max_rejected_rate:.1f})"
+            )
+
+    def log_profile(self):
+        assert self.stage_timer is not None
+        self.get_logger().info(f"Stage timings:\n{self.stage_timer.summary()}")
+
+    def tf_receive(self, msg: TFMessage):
+        for tf in msg.transforms:
+            self.tf_buffer.set_transform(tf, "default_authority")
+            self.cache_world_transform(tf)
+
+    def tf_static_receive(self, msg: TFMessage):
+        for tf in msg.transforms:
+            self.tf_buffer.set_transform_static(tf, "default_authority")
+            self.cache_world_transform(tf)
+
+    def cache_world_transform(self, tf: TransformStamped):
+        """Cache a direct world->frame transform unless a newer one is cached
+
+        Out-of-order or replayed messages must not replace a newer pose.
+        """
+        if tf.header.frame_id != self._world_frame:
+            return
+        cached = self._tf_cache.get(tf.child_frame_id)
+        if (cached is None) or (
+            (tf.header.stamp.sec, tf.header.stamp.nanosec)
+            >= (cached.header.stamp.sec, cached.header.stamp.nanosec)
+        ):
+            self._tf_cache[tf.child_frame_id] = tf
+
+    def lookup_world_transform(self, frame: str) -> TransformStamped:
+        """Get the latest transform from a frame to the world
+
+        Direct world->frame transforms are served from the cache. Anything
+        else falls back to a full lookup in the buffer.
+        """
+        try:
+            return self._tf_cache[frame]
+        except KeyError:
+            return self.tf_buffer.lookup_transform(
+                target_frame=self._world_frame,
+                source_frame=frame,
+                time=Time(),  # get the latest pose
+            )
 
     def trks_fov_receive(self, *args):
         """Receive approximately synchronized tracks and fovs
@@ -116,98 +315,165 @@ class TrustEstimatorNode(Node):
         Since we set a dynamic number of agents, we have to use star input
         """
         if self.verbose:
-            self.get_logger().info(f"Received {len(args)} track/fov messages!")
+            self.get_logger().info(
+                f"Received {len(args)} track/fov messages! "
+                f"({self.synchronizer_trks.n_rejected} rejected by synchronizer)"
+            )
+        if (self._future is not None) and (not self._future.done()):
+            self.n_busy_dropped += 1
+            if self.verbose:
+                self.get_logger().info("Trust model busy, dropping messages")
+            return
 
         ###################################################
         # Store messages
         ###################################################
-        # set up the data structures -- assume things come in order
-        # store track messages
+        # set up the data structures -- assume things come in order:
+        # first are agent tracks, then command center tracks, then agent fovs
+        trks_msgs = args[: self.n_agents]
+        cc_msg = args[self.n_agents]
+        fov_msgs = args[self.n_agents + 1 : 2 * self.n_agents + 1]
+
+        # command center tracks are in world frame
+        # stages are summed over the agents and recorded once per tick
+        stage = self.stage
+        totals: Dict[str, int] = {}
+        assert (
+            cc_msg.header.frame_id == self._world_frame
+        ), "Command center tracks must be in world frame"
+        with stage("user/track_conversion", totals):
+            tracks_cc = TrackBridge.tracks_to_avstack(cc_msg)
+
+        # store agent tracks, FOV, and pose in a single pass
         tracks_agents = {}
-        for i_agent, msg in enumerate(
-            args[: self.n_agents + 1]
-        ):  # first are track messages
-            if i_agent < (self.n_agents):
-                # convert to global reference frame
-                if msg.header.frame_id != "world":
-                    raise NotImplementedError(
-                        "There's a weird bug, so keep things in world frame"
-                    )
-                tracks_agents[i_agent] = TrackBridge.tracks_to_avstack(msg)
-            else:
-                # command center tracks are in world frame
-                cc_msg = msg
-                tracks_cc = TrackBridge.tracks_to_avstack(msg)
-                assert cc_msg.header.frame_id == "world"
-
-        # store FOV and pose messages
         fov_agents = {}
         position_agents = {}
-        for i_agent, msg in enumerate(
-            args[self.n_agents + 1 : 2 * self.n_agents + 1]
-        ):  # second are fov messages
-            # FOV
-            fov_agents[i_agent] = GeometryBridge.polygon_to_avstack(msg)
-            if msg.header.frame_id != "world":
-                raise NotImplementedError("Need to convert to global here")
+        for i_agent, (trks_msg, fov_msg) in enumerate(zip(trks_msgs, fov_msgs)):
+            assert (
+                trks_msg.header.frame_id == self._world_frame
+            ), "There's a weird bug, so keep things in world frame"
+            assert (
+                fov_msg.header.frame_id == self._world_frame
+            ), "Need to convert to global here"
+
+            # tracks and FOV
+            with stage("user/track_conversion", totals):
+                tracks_agents[i_agent] = TrackBridge.tracks_to_avstack(trks_msg)
+            with stage("user/fov_conversion", totals):
+                fov_agents[i_agent] = GeometryBridge.polygon_to_avstack(fov_msg)
 
             # pose
-            tf_world_agent = self.tf_buffer.lookup_transform(
-                target_frame="world",
-                source_frame=f"agent{i_agent}",
-                time=Time(),  # get the latest pose
-            )
-            position_agents[i_agent] = GeometryBridge.position_to_avstack(
-                tf_world_agent.transform.translation,
-                header=tf_world_agent.header,
-            )
+            with stage("user/tf_lookup", totals):
+                frame = self._agent_frames[i_agent]
+                tf_world_agent = self.lookup_world_transform(frame)
+                if tf_world_agent.header.stamp != self._last_tf_stamp.get(i_agent):
+                    # only convert when the pose has been updated
+                    self._last_position[i_agent] = GeometryBridge.position_to_avstack(
+                        tf_world_agent.transform.translation,
+                        header=tf_world_agent.header,
+                    )
+                    self._last_tf_stamp[i_agent] = tf_world_agent.header.stamp
+                position_agents[i_agent] = self._last_position[i_agent]
+
+        if self.stage_timer is not None:
+            self.stage_timer.record_totals(totals)
 
         # log the received transforms
         # if self.verbose:
         #     pos_str = "\n".join([f"{k}:{v}" for k, v in position_agents.items()])
         #     self.get_logger().info(pos_str)
 
+        # hand off to the worker thread
+        timestamp = rostime_to_time(cc_msg.header.stamp)
+        self._future = self._executor_pool.submit(
+            self.compute_and_publish,
+            timestamp=timestamp,
+            position_agents=position_agents,
+            fov_agents=fov_agents,
+            tracks_agents=tracks_agents,
+            tracks_cc=tracks_cc,
+        )
+        self._future.add_done_callback(self._log_exception)
+
+    def compute_and_publish(
+        self, timestamp, position_agents, fov_agents, tracks_agents, tracks_cc
+    ):
+        """Run the trust model on converted inputs and publish the outputs"""
         # propagate the trusts to the current time
-        timestamp = Bridge.rostime_to_time(cc_msg.header.stamp)
-        self.model.updater.propagate_track_trust(timestamp)
-        self.model.updater.propagate_agent_trust(timestamp)
+        stage = self.stage
+        with stage("user/propagate"):
+            self.model.updater.propagate_track_trust(timestamp)
+            self.model.updater.propagate_agent_trust(timestamp)
 
         ###################################################
         # Run PSM generation models
         ###################################################
 
         # run trust model
-        trust_agents, trust_tracks, psms_agents, psms_tracks = self.model(
-            position_agents=position_agents,
-            fov_agents=fov_agents,
-            tracks_agents=tracks_agents,
-            tracks_cc=tracks_cc,
-        )
+        with stage("user/model"):
+            trust_agents, trust_tracks, psms_agents, psms_tracks = self.model(
+                position_agents=position_agents,
+                fov_agents=fov_agents,
+                tracks_agents=tracks_agents,
+                tracks_cc=tracks_cc,
+            )
 
-        # convert outputs
-        psms_agents_msg = TrustBridge.psm_array_to_ros(psms_agents)
-        psms_tracks_msg = TrustBridge.psm_array_to_ros(psms_tracks)
-        trust_agents_msg = TrustBridge.trust_array_to_ros(trust_agents)
-        trust_tracks_msg = TrustBridge.trust_array_to_ros(trust_tracks)
+        # skip publishing if nothing but the time has changed
+        if self.publish_on_change:
+            content = tuple(
+                tuple((p.target, p.value, p.confidence, p.source) for p in psms)
+                for psms in (psms_agents, psms_tracks)
+            ) + tuple(
+                tuple((t.identifier, t.alpha, t.beta) for t in trusts.trusts.values())
+                for trusts in (trust_agents, trust_tracks)
+            )
+            if content == self._last_content:
+                return
+            self._last_content = content
+
+        # convert outputs into the reused message
+        with stage("user/ros_conversion"):
+            frame_msg = TrustBridge.trust_frame_avstack_to_ros(
+                psms_agents=psms_agents,
+                psms_tracks=psms_tracks,
+                trust_agents=trust_agents,
+                trust_tracks=trust_tracks,
+                out=self._trust_frame_msg,
+                pools=self._trust_frame_pools,
+            )
 
         # publish outputs
-        self.publisher_agent_psms.publish(psms_agents_msg)
-        self.publisher_track_psms.publish(psms_tracks_msg)
-        self.publisher_agent_trust.publish(trust_agents_msg)
-        self.publisher_track_trust.publish(trust_tracks_msg)
+        with stage("ros/publish"):
+            self.publisher_trust_frame.publish(frame_msg)
+            if self.legacy_split_topics:
+                self.publisher_agent_psms.publish(frame_msg.psms_agents)
+                self.publisher_track_psms.publish(frame_msg.psms_tracks)
+                self.publisher_agent_trust.publish(frame_msg.trust_agents)
+                self.publisher_track_trust.publish(frame_msg.trust_tracks)
 
         # print out diagnostics
         if self.verbose:
             self.get_logger().info(str(self.model.measurement._diagnostics))
             self.get_logger().info(str(self.model.measurement._assign_diagnostics))
 
+    def _log_exception(self, future):
+        if future.exception() is not None:
+            self.get_logger().error(f"Trust model failed: {future.exception()!r}")
+
+    def destroy_node(self):
+        self._executor_pool.shutdown(wait=True)
+        return super().destroy_node()
+
 
 def main(args=None):
     rclpy.init(args=args)
 
     mate = TrustEstimatorNode()
+    mate.configure_scheduling()
 
-    rclpy.spin(mate)
+    executor = rclpy.executors.MultiThreadedExecutor(num_threads=2)
+    executor.add_node(mate)
+    executor.spin()
 
     # Destroy the node explicitly
     # (optional - otherwise it will be done automatically
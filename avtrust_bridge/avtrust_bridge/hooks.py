@@ -139,6 +139,24 @@ class _TrustHook(RosbagHook):
                 "type": "avtrust_msgs/msg/PsmArray",
                 "data": TrustBridge.psm_array_avstack_to_ros(self.hook.psms_tracks),
             }
+        if all(
+            outputs is not None
+            for outputs in (
+                self.hook.psms_agents,
+                self.hook.psms_tracks,
+                self.hook.trust_agents,
+                self.hook.trust_tracks,
+            )
+        ):
+            self.ros_topic_write["/trust/trust_frame"] = {
+                "type": "avtrust_msgs/msg/TrustFrame",
+                "data": TrustBridge.trust_frame_avstack_to_ros(
+                    psms_agents=self.hook.psms_agents,
+                    psms_tracks=self.hook.psms_tracks,
+                    trust_agents=self.hook.trust_agents,
+                    trust_tracks=self.hook.trust_tracks,
+                ),
+            }
         if self._metrics_assignment is not None:
             self.ros_topic_write["/metrics/security_aware_fusion/assignment"] = {
                 "type": "avstack_msgs/msg/AssignmentMetrics",
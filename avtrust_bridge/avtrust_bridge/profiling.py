@@ -0,0 +1,65 @@
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Callable, ContextManager, Deque, Dict, Iterator, Optional
+
+import numpy as np
+
+
+# signature shared by StageTimer.stage and null_stage
+StageContext = Callable[..., ContextManager[None]]
+
+
+def null_stage(name: str, totals: Optional[dict] = None) -> ContextManager[None]:
+    """Stand-in for StageTimer.stage when profiling is disabled"""
+    return nullcontext()
+
+
+class StageTimer:
+    """Collect wall-clock durations of named processing stages
+
+    Each stage keeps its most recent durations in a bounded deque so
+    percentiles reflect recent behavior. Stages entered several times per
+    tick should accumulate into a totals dict that is recorded once.
+    """
+
+    def __init__(self, maxlen: int = 1000):
+        self.maxlen = maxlen
+        self.durations: Dict[str, Deque[int]] = {}
+
+    @contextmanager
+    def stage(self, name: str, totals: Optional[dict] = None) -> Iterator[None]:
+        """Time a block, adding into totals instead of recording if given"""
+        t_start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter_ns() - t_start
+            if totals is None:
+                self.record(name, elapsed)
+            else:
+                totals[name] = totals.get(name, 0) + elapsed
+
+    def record(self, name: str, elapsed_ns: int):
+        try:
+            self.durations[name].append(elapsed_ns)
+        except KeyError:
+            self.durations[name] = deque([elapsed_ns], maxlen=self.maxlen)
+
+    def record_totals(self, totals: dict):
+        for name, elapsed_ns in totals.items():
+            self.record(name, elapsed_ns)
+
+    def percentiles(self, q=(50, 99)) -> dict:
+        """Get percentiles of each stage duration in milliseconds"""
+        return {
+            name: np.percentile(np.asarray(durations), q) / 1e6
+            for name, durations in list(self.durations.items())
+            if len(durations) > 0
+        }
+
+    def summary(self) -> str:
+        return "\n".join(
+            f"{name}: p50={p50:.3f} ms, p99={p99:.3f} ms"
+            for name, (p50, p99) in self.percentiles(q=(50, 99)).items()
+        )
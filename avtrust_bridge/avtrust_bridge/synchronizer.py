@@ -0,0 +1,49 @@
+from message_filters import TimeSynchronizer
+from rclpy.duration import Duration
+from rclpy.time import Time
+
+
+class ApproximateEpsilonTimeSynchronizer(TimeSynchronizer):
+    """Synchronize messages whose stamps agree to within an epsilon
+
+    Mirrors the ApproximateEpsilonTime policy of the C++ message_filters:
+    an exact time match relaxed by a fixed tolerance. Each input contributes
+    the stamp closest to the newest message and the set is accepted only if
+    all of its stamps lie within epsilon of each other, so matching is
+    linear in the number of inputs instead of searching all stamp
+    combinations as in ApproximateTimeSynchronizer. Producers should stamp
+    their messages from the same sensor time for this to match.
+    """
+
+    def __init__(self, fs, queue_size: int, epsilon: Duration):
+        super().__init__(fs, queue_size)
+        self.epsilon = epsilon.nanoseconds
+        self.n_rejected = 0
+
+    def add(self, msg, my_queue, my_queue_index=None):
+        stamp = Time.from_msg(msg.header.stamp).nanoseconds
+        with self.lock:
+            my_queue[stamp] = msg
+            while len(my_queue) > self.queue_size:
+                del my_queue[min(my_queue)]
+                self.n_rejected += 1
+
+            # find the closest stamp on each input
+            stamps = []
+            for queue in self.queues:
+                if not queue:
+                    return
+                closest = min(queue, key=lambda s: abs(s - stamp))
+                if abs(closest - stamp) > self.epsilon:
+                    return
+                stamps.append(closest)
+            if max(stamps) - min(stamps) > self.epsilon:
+                return
+            self.signalMessage(*[q[s] for q, s in zip(self.queues, stamps)])
+
+            # anything up to the match can no longer be synchronized
+            for queue, s in zip(self.queues, stamps):
+                stale = [s_q for s_q in queue if s_q <= s]
+                for s_q in stale:
+                    del queue[s_q]
+                self.n_rejected += len(stale) - 1
@@ -2,7 +2,6 @@
 
 import os
 import threading
-from functools import partial
 
 #################################################################
 # fmt: off
@@ -20,13 +19,13 @@ import matplotlib.colors as mcolors
 import matplotlib.pyplot as plt
 import numpy as np
 import rclpy
-from avstack_bridge import Bridge
 from rclpy.node import Node
 from scipy.stats import beta
 
 from avtrust_msgs.msg import TrustArray as TrustArrayRos
+from avtrust_msgs.msg import TrustFrame as TrustFrameRos
 
-from .bridge import TrustBridge
+from .bridge import TrustBridge, rostime_to_time
 
 
 agent_colors = {
@@ -61,10 +60,6 @@ def get_track_color(ID_track):
     return track_colors[ID_track % len(track_colors)]
 
 
-def rostime_to_time(msg):
-    return float(msg.sec + msg.nanosec / 1e9)
-
-
 class TrustVisualizer(Node):
     """Trust Visualizer for showing how to use matplotlib within ros 2 node
 
@@ -119,17 +114,10 @@ class TrustVisualizer(Node):
             durability=rclpy.qos.QoSDurabilityPolicy.VOLATILE,
         )
         self.cbg = rclpy.callback_groups.MutuallyExclusiveCallbackGroup()
-        self.sub_agent_trust = self.create_subscription(
-            TrustArrayRos,
-            "trust_agents",
-            partial(self.trust_callback, self.agent_trust_data, self.agent_ids_active),
-            qos_profile=qos,
-            callback_group=self.cbg,
-        )
-        self.sub_track_trust = self.create_subscription(
-            TrustArrayRos,
-            "trust_tracks",
-            partial(self.trust_callback, self.track_trust_data, self.track_ids_active),
+        self.sub_trust_frame = self.create_subscription(
+            TrustFrameRos,
+            "trust_frame",
+            self.trust_frame_callback,
             qos_profile=qos,
             callback_group=self.cbg,
         )
@@ -171,6 +159,19 @@ class TrustVisualizer(Node):
 
         # raise RuntimeError(str(self.track_trust_plot))
 
+    def trust_frame_callback(self, msg: TrustFrameRos):
+        """Callback for subscriber to the combined trust outputs
+
+        Args:
+            msg: message from subscriber
+        """
+        self.trust_callback(
+            self.agent_trust_data, self.agent_ids_active, msg.trust_agents
+        )
+        self.trust_callback(
+            self.track_trust_data, self.track_ids_active, msg.trust_tracks
+        )
+
     def trust_callback(self, datastruct: dict, actives: set, msg: TrustArrayRos):
         """Callback for subscriber
 
@@ -181,7 +182,7 @@ class TrustVisualizer(Node):
         with self._lock:
             # get trust data
             trust_array = TrustBridge.trust_array_ros_to_avstack(msg)
-            timestamp = Bridge.rostime_to_time(msg.header.stamp)
+            timestamp = rostime_to_time(msg.header.stamp)
             if timestamp < self.last_timestamp:
                 self.clear()
             else:
@@ -0,0 +1,31 @@
+import os
+
+from ament_index_python.packages import get_package_share_directory
+from launch import LaunchDescription
+from launch.actions import SetEnvironmentVariable
+from launch_ros.actions import Node
+
+
+def generate_launch_description():
+    cyclonedds_config = os.path.join(
+        get_package_share_directory("avtrust_bridge"),
+        "config",
+        "cyclonedds.xml",
+    )
+
+    rmw_implementation = SetEnvironmentVariable(
+        "RMW_IMPLEMENTATION", "rmw_cyclonedds_cpp"
+    )
+    # discovery stays compatible with processes that do not use this config
+    cyclonedds_uri = SetEnvironmentVariable(
+        "CYCLONEDDS_URI", f"file://{cyclonedds_config}"
+    )
+
+    trust_estimator = Node(
+        package="avtrust_bridge",
+        executable="estimator",
+        name="trust_estimator",
+        arguments=["--ros-args", "--log-level", "INFO"],
+    )
+
+    return LaunchDescription([rmw_implementation, cyclonedds_uri, trust_estimator])
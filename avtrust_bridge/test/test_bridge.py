@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+from avtrust_msgs.msg import TrustArray as TrustArrayRos
+
+from avtrust_bridge.bridge import TrustBridge, get_global_header, refill_sequence
+
+
+def make_trusts(n_items: int, timestamp: float = 1.0) -> list:
+    return [
+        SimpleNamespace(timestamp=timestamp, identifier=i, alpha=1.0, beta=2.0)
+        for i in range(n_items)
+    ]
+
+
+def refill(msg: TrustArrayRos, pool: list, trusts: list, timestamp: float = 1.0):
+    msg.header = get_global_header(timestamp)
+    refill_sequence(
+        msg.trusts,
+        trusts,
+        TrustBridge.trust_avstack_to_ros,
+        header=msg.header,
+        timestamp=timestamp,
+        pool=pool,
+    )
+
+
+def test_refill_grow():
+    msg, pool = TrustArrayRos(), []
+    refill(msg, pool, make_trusts(2))
+    refill(msg, pool, make_trusts(3))
+    assert len(msg.trusts) == 3
+    assert len(pool) == 3
+    assert [trust.identifier for trust in msg.trusts] == [0, 1, 2]
+
+
+def test_refill_shrink_keeps_pool():
+    msg, pool = TrustArrayRos(), []
+    refill(msg, pool, make_trusts(3))
+    pooled = list(pool)
+    refill(msg, pool, make_trusts(1))
+    assert len(msg.trusts) == 1
+    assert len(pool) == 3
+    refill(msg, pool, make_trusts(3))
+    assert all(a is b for a, b in zip(msg.trusts, pooled))
+
+
+def test_refill_shared_header():
+    msg, pool = TrustArrayRos(), []
+    trusts = make_trusts(1, timestamp=1.0) + make_trusts(1, timestamp=0.5)
+    refill(msg, pool, trusts, timestamp=1.0)
+    assert msg.trusts[0].header is msg.header
+    assert msg.trusts[1].header is not msg.header
+    assert msg.trusts[1].header.stamp != msg.header.stamp
@@ -0,0 +1,78 @@
+from geometry_msgs.msg import PointStamped
+from message_filters import SimpleFilter
+from rclpy.duration import Duration
+from rclpy.time import Time
+
+from avtrust_bridge.synchronizer import ApproximateEpsilonTimeSynchronizer
+
+
+def make_msg(t_ms: float) -> PointStamped:
+    msg = PointStamped()
+    msg.header.stamp = Time(nanoseconds=int(t_ms * 1e6)).to_msg()
+    return msg
+
+
+def make_synchronizer(n_inputs: int = 2, queue_size: int = 2, epsilon_ms=10):
+    inputs = [SimpleFilter() for _ in range(n_inputs)]
+    sync = ApproximateEpsilonTimeSynchronizer(
+        inputs,
+        queue_size=queue_size,
+        epsilon=Duration(nanoseconds=int(epsilon_ms * 1e6)),
+    )
+    received = []
+    sync.registerCallback(lambda *msgs: received.append(msgs))
+    return inputs, sync, received
+
+
+def test_match_within_epsilon():
+    inputs, sync, received = make_synchronizer()
+    msg_a, msg_b = make_msg(100), make_msg(105)
+    inputs[0].signalMessage(msg_a)
+    inputs[1].signalMessage(msg_b)
+    assert len(received) == 1
+    assert received[0] == (msg_a, msg_b)
+    assert sync.n_rejected == 0
+    assert all(len(q) == 0 for q in sync.queues)
+
+
+def test_reject_beyond_epsilon():
+    inputs, sync, received = make_synchronizer()
+    inputs[0].signalMessage(make_msg(100))
+    inputs[1].signalMessage(make_msg(150))
+    assert len(received) == 0
+    assert sync.n_rejected == 0
+
+
+def test_match_within_epsilon_three_inputs():
+    inputs, sync, received = make_synchronizer(n_inputs=3)
+    for i_input, t_ms in enumerate([95, 104, 100]):
+        inputs[i_input].signalMessage(make_msg(t_ms))
+    assert len(received) == 1
+
+
+def test_reject_spread_beyond_epsilon():
+    # every stamp is within epsilon of the newest, but the spread is 18 ms
+    inputs, sync, received = make_synchronizer(n_inputs=3)
+    for i_input, t_ms in enumerate([91, 109, 100]):
+        inputs[i_input].signalMessage(make_msg(t_ms))
+    assert len(received) == 0
+
+
+def test_rejected_on_queue_overflow():
+    inputs, sync, received = make_synchronizer(queue_size=2)
+    for t_ms in [100, 200, 300]:
+        inputs[0].signalMessage(make_msg(t_ms))
+    assert len(received) == 0
+    assert sync.n_rejected == 1
+    assert sorted(sync.queues[0]) == [int(200e6), int(300e6)]
+
+
+def test_rejected_stale_entries():
+    inputs, sync, received = make_synchronizer(queue_size=2)
+    inputs[0].signalMessage(make_msg(100))
+    inputs[0].signalMessage(make_msg(200))
+    inputs[1].signalMessage(make_msg(201))
+    assert len(received) == 1
+    assert received[0][0].header.stamp == make_msg(200).header.stamp
+    assert sync.n_rejected == 1
+    assert all(len(q) == 0 for q in sync.queues)